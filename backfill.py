@@ -0,0 +1,169 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import firebase_admin
+import numpy as np
+import pandas as pd
+from firebase_admin import credentials, firestore
+
+# ==================== CONFIGURATION ====================
+HISTORY_COLLECTION = 'room_data_history'
+HOURLY_PROFILE_COLLECTION = 'room_hourly_profile'
+ROOM_IDS = ['Classroom 1', 'Classroom 2', 'Lab 101']
+HISTORY_DAYS = 30
+HISTORY_INTERVAL_MINUTES = 15
+FLUSH_EVERY_DOCS = 1000
+CHECKPOINT_FILE = '.backfill_ckpt'
+
+# ==================== FIREBASE CONNECTION ====================
+def initialize_firebase():
+    """Initialize Firebase connection (same credentials as the dashboard)"""
+    cred = credentials.Certificate("firebase_credentials.json")
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(cred)
+    return firestore.client()
+
+# ==================== DATA GENERATION ====================
+def _build_schedule():
+    """Campus schedule as a 7x24 (weekday, hour) lookup table.
+
+    Each slot holds (occupancy probability, min people, max people);
+    generation indexes the table directly instead of re-evaluating the
+    schedule branches per timestamp.
+    """
+    table = np.zeros((7, 24), dtype=[('p', 'f4'), ('lo', 'i2'), ('hi', 'i2')])
+    table[:] = (0.02, 1, 3)
+    table[:5, 8:12] = (0.9, 10, 35)    # weekday mornings
+    table[:5, 13:17] = (0.8, 8, 30)    # weekday afternoons
+    table[:5, 18:22] = (0.4, 2, 12)    # weekday evenings
+    table[5:, 10:18] = (0.2, 1, 8)     # weekend daytime
+    return table
+
+SCHEDULE = _build_schedule()
+
+def generate_sensor_data(room_id, timestamps, rng):
+    """Generate aggregated sensor readings for one room across a whole timeline"""
+    n = len(timestamps)
+    hours = timestamps.hour.values
+    weekdays = timestamps.weekday.values
+
+    slots = SCHEDULE[weekdays, hours]
+    occupancy_chance = slots['p']
+    min_people = slots['lo']
+    max_people = slots['hi'].astype(np.int64)
+
+    is_occupied = rng.random(n) < occupancy_chance
+    person_count = np.where(is_occupied, rng.integers(min_people, max_people + 1), 0)
+
+    df = pd.DataFrame({
+        'room_id': room_id,
+        'timestamp': timestamps,
+        'is_occupied': is_occupied,
+        'avg_person_count': person_count,
+        'max_person_count': np.where(is_occupied, person_count + rng.integers(0, 4, n), 0),
+        'avg_light_intensity': np.where(is_occupied, rng.uniform(300, 800, n), rng.uniform(0, 50, n)),
+        'avg_air_quality_ppm': np.where(is_occupied, rng.uniform(600, 1200, n), rng.uniform(400, 550, n)),
+        'avg_temperature': np.where(is_occupied, rng.uniform(22, 27, n), rng.uniform(19, 23, n)),
+        'avg_humidity': rng.uniform(45, 65, n),
+        'is_smoke_detected': False,
+    })
+    return df
+
+def hourly_profile(df):
+    """Aggregate one room's timeline into 24 hour-of-day buckets"""
+    grouped = df.groupby(df['timestamp'].dt.hour)['avg_person_count'].agg(['sum', 'count'])
+    return [
+        {'hour': int(hour), 'sum_person_count': float(row['sum']), 'sample_count': int(row['count'])}
+        for hour, row in grouped.iterrows()
+    ]
+
+# ==================== CHECKPOINTING ====================
+def load_checkpoint():
+    """Load the progress of a previous interrupted run, if any"""
+    try:
+        with open(CHECKPOINT_FILE) as f:
+            ckpt = json.load(f)
+        return {
+            'seed': ckpt['seed'],
+            'start': datetime.fromisoformat(ckpt['start']),
+            'end': datetime.fromisoformat(ckpt['end']),
+            'written': ckpt['written'],
+        }
+    except (OSError, ValueError, KeyError):
+        return None
+
+def save_checkpoint(seed, start, end, written):
+    """Atomically record progress so a failed run can resume where it stopped"""
+    tmp_path = CHECKPOINT_FILE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'seed': seed, 'start': start.isoformat(),
+                   'end': end.isoformat(), 'written': written}, f)
+    os.replace(tmp_path, CHECKPOINT_FILE)
+
+# ==================== FIRESTORE WRITING ====================
+def backfill_historical_data(db):
+    """Generate and upload the full historical window for all rooms"""
+    # A fixed seed plus the checkpointed timeline makes generation fully
+    # reproducible, so a resumed run regenerates the identical records
+    # and simply skips the ones already written.
+    checkpoint = load_checkpoint()
+    if checkpoint:
+        seed, start_time, now, written = (
+            checkpoint['seed'], checkpoint['start'], checkpoint['end'], checkpoint['written'])
+        print(f"🔁 Resuming interrupted backfill from document {written}...")
+    else:
+        seed = int(np.random.SeedSequence().entropy)
+        now = datetime.now()
+        start_time = now - timedelta(days=HISTORY_DAYS)
+        written = 0
+
+    print(f"🏢 Generating {HISTORY_DAYS} days of data for {len(ROOM_IDS)} rooms...")
+    timestamps = pd.date_range(start_time, now, freq=f'{HISTORY_INTERVAL_MINUTES}min')
+    rng = np.random.default_rng(seed)
+    room_frames = {room_id: generate_sensor_data(room_id, timestamps, rng) for room_id in ROOM_IDS}
+
+    # Coalesce the rooms into one document per timestamp with a `rooms`
+    # map field: a third of the writes and storage of one-doc-per-room,
+    # while the dashboard projects a single room's map entry on read.
+    room_records = {
+        room_id: df.drop(columns=['room_id', 'timestamp']).to_dict('records')
+        for room_id, df in room_frames.items()
+    }
+    records = [
+        {'timestamp': ts, 'rooms': {room_id: room_records[room_id][i] for room_id in ROOM_IDS}}
+        for i, ts in enumerate(timestamps)
+    ]
+
+    # BulkWriter pipelines non-atomic writes with its own concurrency,
+    # rate-limit ramp and retry backoff, so no batching or retry wrapper
+    # is needed here — each write is dispatched independently. Document
+    # IDs are derived from the timestamp so a resumed (or fully re-run)
+    # upload overwrites the documents already dispatched past the last
+    # checkpoint instead of duplicating them under auto-generated IDs.
+    print(f"📤 Uploading {len(records) - written} of {len(records)} documents via BulkWriter...")
+    bulk_writer = db.bulk_writer()
+    history_ref = db.collection(HISTORY_COLLECTION)
+    for i, data in enumerate(records[written:], start=written + 1):
+        bulk_writer.set(history_ref.document(data['timestamp'].isoformat()), data)
+        if i % FLUSH_EVERY_DOCS == 0:
+            bulk_writer.flush()
+            save_checkpoint(seed, start_time, now, i)
+            print(f"   ...{i}/{len(records)} documents written")
+
+    # Pre-aggregated hour-of-day rollup: the dashboard reads these 24 docs
+    # per room instead of re-scanning the raw window for its hourly profile.
+    print("📊 Writing hourly occupancy profiles...")
+    for room_id, df in room_frames.items():
+        hours_ref = db.collection(HOURLY_PROFILE_COLLECTION).document(room_id).collection('hours')
+        for bucket in hourly_profile(df):
+            bulk_writer.set(hours_ref.document(str(bucket['hour'])), bucket)
+    bulk_writer.close()
+
+    if os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+    print(f"✅ Backfill complete: {len(records)} documents written.")
+
+# ==================== ENTRY POINT ====================
+if __name__ == "__main__":
+    backfill_historical_data(initialize_firebase())
@@ -1,13 +1,17 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit_autorefresh import st_autorefresh
 import pandas as pd
 import firebase_admin
 from firebase_admin import credentials, firestore
-from google.cloud.firestore_v1.base_query import FieldFilter, And
-from sklearn.linear_model import LinearRegression
-import plotly.express as px
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
 import plotly.graph_objects as go
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import os
+import threading
 import time
 
 # ==================== PAGE CONFIGURATION ====================
@@ -92,21 +96,39 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ==================== FIREBASE CONNECTION ====================
+FIRESTORE_POOL_SIZE = 4
+
 @st.cache_resource
 def initialize_firebase():
-    """Initialize Firebase connection (runs only once)"""
+    """Initialize a small pool of Firebase clients (runs only once).
+
+    gRPC serializes concurrent RPCs on a single channel, so one shared
+    client bottlenecks simultaneous sessions; a few clients, each with
+    its own channel, let independent queries truly overlap.
+    """
     try:
         cred = credentials.Certificate("firebase_credentials.json")
-        if not firebase_admin._apps:
-            firebase_admin.initialize_app(cred)
-        db = firestore.client()
-        return db, True
+        clients = []
+        for i in range(FIRESTORE_POOL_SIZE):
+            app_name = f'tecnosense-{i}'
+            if app_name in firebase_admin._apps:
+                app = firebase_admin.get_app(app_name)
+            else:
+                app = firebase_admin.initialize_app(cred, name=app_name)
+            clients.append(firestore.client(app=app))
+        return clients, True
     except Exception as e:
         st.error(f"Failed to connect to Firebase: {e}")
-        return None, False
+        return [], False
 
-# Initialize Firebase
-db, firebase_connected = initialize_firebase()
+# Initialize Firebase and spread sessions across the client pool
+dbs, firebase_connected = initialize_firebase()
+if dbs:
+    if 'client_index' not in st.session_state:
+        st.session_state.client_index = time.time_ns() % len(dbs)
+    db = dbs[st.session_state.client_index]
+else:
+    db = None
 
 # ==================== SESSION STATE INITIALIZATION ====================
 if 'selected_room' not in st.session_state:
@@ -118,128 +140,373 @@ if 'hours_to_show' not in st.session_state:
 if 'latest_data' not in st.session_state:
     st.session_state.latest_data = None
 if 'historical_data' not in st.session_state:
-    st.session_state.historical_data = pd.DataFrame()
+    st.session_state.historical_data = {}
 if 'auto_refresh' not in st.session_state:
     st.session_state.auto_refresh = False
 
+# The historical window is kept in session state as a plain dict of NumPy
+# columns rather than a DataFrame: the sections that consume it only need
+# columnar access, and a dict of ndarrays avoids carrying the DataFrame's
+# index and block-manager overhead between reruns.
+def _as_columns(df):
+    """Break a frame into a {column: ndarray} dict for session state"""
+    return {
+        col: df[col].to_numpy(dtype='datetime64[ns]') if col == 'timestamp'
+        else df[col].to_numpy()
+        for col in df.columns
+    }
+
+def _as_df():
+    """Rebuild the stored columns into a frame, only at chart-build time"""
+    return pd.DataFrame(st.session_state.historical_data, copy=False)
+
 # ==================== DATA FETCHING FUNCTIONS ====================
+# Backfilled history lives in coalesced documents: one doc per timestamp
+# with a `rooms` map holding every room's reading
+HISTORY_COLLECTION = 'room_data_history'
+HISTORY_PAGE_SIZE = 500
+HISTORY_ROOM_FIELDS = (
+    'is_occupied', 'avg_person_count', 'max_person_count',
+    'avg_light_intensity', 'avg_air_quality_ppm',
+    'avg_temperature', 'avg_humidity', 'is_smoke_detected',
+)
+
+# Only the fields each read path actually consumes; projecting them keeps
+# payload bytes and per-document dict construction proportional to what
+# the dashboard displays.
+LATEST_STATUS_FIELDS = [
+    'timestamp', 'room_id', 'is_occupied', 'avg_person_count',
+    'avg_light_intensity', 'avg_air_quality_ppm', 'avg_temperature',
+    'avg_humidity', 'is_smoke_detected', 'auto_mode',
+]
+
 @st.cache_data(ttl=10)
-def fetch_firestore_data(_db, query_info):
-    """Fetch data from Firestore with proper error handling"""
+def fetch_latest_doc(_db, room_id):
+    """Fetch the newest reading for a room as a plain dict.
+
+    The simulator mirrors each room's newest state into a document keyed
+    by room id, so the common case is a single O(1) get() — the cheapest
+    Firestore read there is. The indexed limit=1 scan remains as a
+    fallback for data written before the current-state collection
+    existed.
+    """
+    if not _db:
+        return None
+
+    try:
+        doc = _db.collection('room_state_current').document(room_id).get()
+        if doc.exists:
+            return doc.to_dict()
+
+        query = (_db.collection('room_data_aggregated')
+                 .where(filter=FieldFilter('room_id', '==', room_id))
+                 .order_by("timestamp", direction=firestore.Query.DESCENDING)
+                 .limit(1)
+                 .select(LATEST_STATUS_FIELDS))
+        doc = next(iter(query.stream()), None)
+        return doc.to_dict() if doc else None
+
+    except Exception as e:
+        st.error(f"Firestore Query Error: {e}")
+        return None
+
+def _narrow_dtypes(df):
+    """Move a fetched frame onto pyarrow-backed columns with narrow types.
+
+    Arrow buffers are columnar and float32/int16 halve the width of the
+    default dtypes, shrinking the 30-day frame and every serialization
+    of it. Falls back to float32 NumPy dtypes if pyarrow is missing.
+    """
+    float_cols = ('avg_light_intensity', 'avg_air_quality_ppm',
+                  'avg_temperature', 'avg_humidity')
+    try:
+        df = df.convert_dtypes(dtype_backend='pyarrow')
+        for col in float_cols:
+            if col in df.columns:
+                df[col] = df[col].astype('float32[pyarrow]')
+        for col in ('avg_person_count', 'max_person_count'):
+            if col in df.columns:
+                df[col] = df[col].astype('int16[pyarrow]')
+    except Exception:
+        for col in float_cols + ('avg_person_count', 'max_person_count'):
+            if col in df.columns:
+                df[col] = df[col].astype(np.float32)
+    return df
+
+@st.cache_data(ttl=10)
+def fetch_history_delta(_db, room_id, start_time):
+    """Fetch coalesced history documents and flatten one room's map.
+
+    Each document carries all rooms in a `rooms` map; projecting
+    `timestamp` plus the selected room's entry keeps the payload the
+    same size as the old one-doc-per-room scheme at a third of the
+    write and storage cost.
+    """
     if not _db:
         return pd.DataFrame()
-    
+
     try:
-        collection_ref = _db.collection('room_data_aggregated')
-        query = collection_ref
-        filters = []
-        
-        # Build query filters
-        if 'room_id' in query_info:
-            filters.append(FieldFilter('room_id', '==', query_info['room_id']))
-        if 'start_time' in query_info:
-            filters.append(FieldFilter('timestamp', '>=', query_info['start_time']))
-        
-        # Apply filters
-        if len(filters) > 1:
-            query = query.where(filter=And(filters))
-        elif len(filters) == 1:
-            query = query.where(filter=filters[0])
-        
-        # Order and limit
-        query = query.order_by("timestamp", direction=firestore.Query.DESCENDING)
-        if 'limit' in query_info:
-            query = query.limit(query_info['limit'])
-        
-        # Execute query
-        docs = query.stream()
-        records = [doc.to_dict() for doc in docs]
-        
-        if not records:
+        room_field = FieldPath('rooms', room_id).to_api_repr()
+        query = (_db.collection(HISTORY_COLLECTION)
+                 .where(filter=FieldFilter('timestamp', '>=', start_time))
+                 .order_by('timestamp')
+                 .select(['timestamp', room_field]))
+
+        # Page through with a cursor: a 30-day cold load is ~2880 docs,
+        # and fixed-size pages keep each round-trip's working set bounded.
+        # Rows go straight into per-field columns (the known room-map
+        # schema) so no list of row dicts is ever materialized.
+        cols = {field: [] for field in ('timestamp',) + HISTORY_ROOM_FIELDS}
+        n_rows = 0
+        last_doc = None
+        while True:
+            page = query.limit(HISTORY_PAGE_SIZE)
+            if last_doc is not None:
+                page = page.start_after(last_doc)
+            docs = list(page.stream())
+            if not docs:
+                break
+            for doc in docs:
+                d = doc.to_dict()
+                room = d.get('rooms', {}).get(room_id)
+                if room is not None:
+                    cols['timestamp'].append(d.get('timestamp'))
+                    for field in HISTORY_ROOM_FIELDS:
+                        cols[field].append(room.get(field))
+                    n_rows += 1
+            last_doc = docs[-1]
+            if len(docs) < HISTORY_PAGE_SIZE:
+                break
+
+        if n_rows == 0:
             return pd.DataFrame()
-        
-        df = pd.DataFrame(records)
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        return df
-    
+
+        df = pd.DataFrame(cols)
+        # Firestore returns tz-aware values; utc=True skips per-element
+        # format inference and guarantees a single datetime64 dtype
+        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
+        return _narrow_dtypes(df)
+
     except Exception as e:
         st.error(f"Firestore Query Error: {e}")
         return pd.DataFrame()
 
-@st.cache_data
-def generate_mock_fallback_data():
-    """Generate mock data as fallback when Firebase is not available"""
-    now = datetime.now()
-    
-    # Current status data
-    current_data = {
+HIST_CACHE_DIR = '.hist_cache'
+
+def _history_cache_path(room_id):
+    return os.path.join(HIST_CACHE_DIR, f"{room_id.replace(' ', '_')}.parquet")
+
+def _load_history_cache(room_id):
+    """Load a previous session's historical window from disk, if available"""
+    try:
+        return pd.read_parquet(_history_cache_path(room_id))
+    except Exception:
+        return pd.DataFrame()
+
+def _save_history_cache(room_id, df):
+    try:
+        os.makedirs(HIST_CACHE_DIR, exist_ok=True)
+        df.to_parquet(_history_cache_path(room_id), index=False)
+    except Exception:
+        pass  # Cache persistence is best-effort only
+
+def fetch_historical_window(_db, room_id, start_time_dt):
+    """Fetch the historical window, querying only points newer than the cache.
+
+    Re-reading the whole window every refresh costs O(window) document
+    reads; keeping the last result per room and asking Firestore only for
+    `timestamp > last seen` drops steady-state reads to the handful of
+    points written since the previous refresh.
+    """
+    cache = st.session_state.setdefault('hist_cache', {})
+    # Window start each cache entry was last trimmed to: the delta query
+    # only applies while the new request fits inside that coverage.
+    # Widening the range (say 24h -> 30 days) after the cache was trimmed
+    # to a narrower window must re-fetch from the requested start, or the
+    # wider view would show only the cached slice.
+    coverage = st.session_state.setdefault('hist_coverage', {})
+    cached_df = cache.get(room_id)
+    if cached_df is None:
+        cached_df = _load_history_cache(room_id)
+
+    query_start = start_time_dt
+    if not cached_df.empty:
+        covered_from = coverage.get(room_id)
+        if covered_from is not None and covered_from <= start_time_dt:
+            query_start = cached_df['timestamp'].max() + timedelta(microseconds=1)
+
+    new_df = fetch_history_delta(_db, room_id, query_start)
+    df = pd.concat([cached_df, new_df], ignore_index=True) if not cached_df.empty else new_df
+
+    if not df.empty:
+        # Evict points that have fallen out of the requested window
+        window_start = pd.Timestamp(start_time_dt)
+        if df['timestamp'].dt.tz is not None and window_start.tzinfo is None:
+            window_start = window_start.tz_localize(df['timestamp'].dt.tz)
+        df = df[df['timestamp'] >= window_start]
+        df = df.drop_duplicates('timestamp', keep='last')
+        df = df.sort_values('timestamp', ignore_index=True)
+        cache[room_id] = df
+        coverage[room_id] = start_time_dt
+        _save_history_cache(room_id, df)
+
+    return df
+
+# Module-level Generator: the new RNG API is faster than legacy np.random.*
+# and one instance serves every mock refresh
+_mock_rng = np.random.default_rng()
+
+def generate_mock_current():
+    """Generate a mock current-status reading when Firebase is not available.
+
+    Deliberately uncached: the status tiles should show fresh demo values
+    on every rerun, and the dict costs microseconds to build.
+    """
+    return {
         'room_id': st.session_state.selected_room,
-        'is_occupied': np.random.choice([True, False], p=[0.7, 0.3]),
-        'avg_person_count': np.random.randint(0, 15),
-        'avg_light_intensity': np.random.uniform(150, 800),
-        'avg_air_quality_ppm': np.random.uniform(400, 1200),
-        'avg_temperature': np.random.uniform(20, 28),
-        'avg_humidity': np.random.uniform(40, 70),
+        'is_occupied': bool(_mock_rng.random() < 0.7),
+        'avg_person_count': int(_mock_rng.integers(0, 15)),
+        'avg_light_intensity': _mock_rng.uniform(150, 800),
+        'avg_air_quality_ppm': _mock_rng.uniform(400, 1200),
+        'avg_temperature': _mock_rng.uniform(20, 28),
+        'avg_humidity': _mock_rng.uniform(40, 70),
         'is_smoke_detected': False,
-        'timestamp': now,
-        'light_on': np.random.choice([True, False]),
-        'ac_on': np.random.choice([True, False]),
-        'fan_on': np.random.choice([True, False]),
-        'auto_mode': np.random.choice([True, False], p=[0.8, 0.2]),
+        'timestamp': datetime.now(),
+        'light_on': bool(_mock_rng.random() < 0.5),
+        'ac_on': bool(_mock_rng.random() < 0.5),
+        'fan_on': bool(_mock_rng.random() < 0.5),
+        'auto_mode': bool(_mock_rng.random() < 0.8),
     }
-    
-    # Historical data (last 24 hours)
-    timestamps = [now - timedelta(minutes=x*10) for x in range(144, 0, -1)]
-    historical_data = []
-    
-    for i, ts in enumerate(timestamps):
-        # Simulate realistic patterns
-        hour = ts.hour
-        if 8 <= hour <= 18:  # Working hours
-            base_occupancy = np.random.poisson(8)
-        elif 19 <= hour <= 22:  # Evening
-            base_occupancy = np.random.poisson(3)
-        else:  # Night
-            base_occupancy = np.random.poisson(0.5)
-            
-        historical_data.append({
-            'room_id': st.session_state.selected_room,
-            'timestamp': ts,
-            'avg_person_count': max(0, base_occupancy + np.random.randint(-2, 3)),
-            'avg_light_intensity': np.random.uniform(100, 900),
-            'avg_air_quality_ppm': np.random.uniform(350, 1300),
-            'avg_temperature': np.random.uniform(19, 29),
-            'avg_humidity': np.random.uniform(35, 75),
-            'is_occupied': base_occupancy > 0,
-            'is_smoke_detected': False
-        }) 
-    
-    return current_data, pd.DataFrame(historical_data)
+
+@st.cache_data(ttl=600)
+def generate_mock_history(room_id):
+    """Generate a mock 24-hour history window for one room.
+
+    Cached per room: the window only needs to drift slowly in demo mode,
+    so the Poisson draws and DataFrame build run once per ttl instead of
+    twice per rerun alongside the current-status mock.
+    """
+    # Historical data (last 24 hours), generated column-wise: realistic
+    # patterns come from an hour-dependent Poisson rate drawn as one array
+    timestamps = pd.date_range(end=datetime.now(), periods=144, freq='10min')
+    hours = timestamps.hour.to_numpy()
+
+    rate = np.where((hours >= 8) & (hours <= 18), 8.0,          # Working hours
+                    np.where((hours >= 19) & (hours <= 22), 3.0,  # Evening
+                             0.5))                                # Night
+    base_occupancy = _mock_rng.poisson(rate)
+
+    historical_df = pd.DataFrame({
+        'room_id': room_id,
+        'timestamp': timestamps,
+        'avg_person_count': np.maximum(0, base_occupancy + _mock_rng.integers(-2, 3, 144)),
+        'avg_light_intensity': _mock_rng.uniform(100, 900, 144),
+        'avg_air_quality_ppm': _mock_rng.uniform(350, 1300, 144),
+        'avg_temperature': _mock_rng.uniform(19, 29, 144),
+        'avg_humidity': _mock_rng.uniform(35, 75, 144),
+        'is_occupied': base_occupancy > 0,
+        'is_smoke_detected': False
+    })
+
+    return historical_df
+
+@st.cache_data(ttl=60)
+def fetch_hourly_profile(_db, room_id):
+    """Fetch the pre-aggregated hour-of-day profile written at backfill time.
+
+    24 documents replace a full scan of the raw window (up to 2880 docs
+    for the 30-day range) plus the client-side groupby.
+    """
+    if not _db:
+        return pd.DataFrame()
+
+    try:
+        docs = _db.collection('room_hourly_profile').document(room_id).collection('hours').stream()
+        rows = [doc.to_dict() for doc in docs]
+        if not rows:
+            return pd.DataFrame()
+
+        profile = pd.DataFrame(rows)
+        profile['avg_person_count'] = (
+            profile['sum_person_count'] / profile['sample_count'].clip(lower=1)
+        )
+        return profile.sort_values('hour', ignore_index=True)[['hour', 'avg_person_count']]
+
+    except Exception as e:
+        st.error(f"Firestore Query Error: {e}")
+        return pd.DataFrame()
+
+def prefetch_room_data():
+    """Run the latest-status and historical fetches in parallel.
+
+    The two reads are independent, so overlapping them cuts the
+    top-of-page latency to the slower round-trip instead of their sum.
+    """
+    if not (firebase_connected and db):
+        return
+
+    start_time_dt = datetime.now() - timedelta(hours=st.session_state.hours_to_show)
+
+    # Pool threads need the caller's ScriptRunContext attached: without
+    # it Streamlit hands them a bare-mode session state, so the window
+    # cache bookkeeping inside fetch_historical_window would land in a
+    # throwaway mock instead of this session (and st.error raised from a
+    # worker would be silently dropped).
+    ctx = get_script_run_ctx()
+
+    def _run_with_ctx(fn, *args):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        latest_future = executor.submit(
+            _run_with_ctx, fetch_latest_doc, db, st.session_state.selected_room)
+        history_future = executor.submit(
+            _run_with_ctx, fetch_historical_window, db, st.session_state.selected_room, start_time_dt)
+        st.session_state.prefetched_latest = latest_future.result()
+        st.session_state.prefetched_history = history_future.result()
+        st.session_state.prefetched_room = st.session_state.selected_room
+        st.session_state.prefetched_hours = st.session_state.hours_to_show
 
 # ==================== AI/ML ANALYSIS ====================
-def analyze_occupancy_pattern(df):
-    """AI-powered occupancy pattern analysis"""
-    if df.shape[0] < 2:
-        return None, "Not enough data for analysis."
-    
-    df_copy = df.copy()
-    df_copy['hour'] = df_copy['timestamp'].dt.hour
-    hourly_avg = df_copy.groupby('hour')['avg_person_count'].mean().reset_index()
-    
+@st.cache_data(ttl=60, show_spinner=False)
+def analyze_occupancy_pattern(_df, room_id, last_ts, hourly_avg=None):
+    """AI-powered occupancy pattern analysis.
+
+    Cached per (room, newest point, rollup) so UI interactions that do
+    not change the underlying data skip the groupby and trend fit
+    entirely; `_df` itself is excluded from the cache key. The hour-of-day
+    buckets span the rollup's whole lifetime, so the selected range is
+    deliberately not part of the key.
+    """
+    if hourly_avg is None or hourly_avg.empty:
+        # Fallback for demo mode: aggregate client-side from the raw
+        # window — bincount gives the 24-bin mean in one pass, with no
+        # frame copy or groupby machinery
+        if _df.shape[0] < 2:
+            return None, "Not enough data for analysis."
+
+        hours = pd.to_datetime(_df['timestamp']).dt.hour.to_numpy()
+        counts = _df['avg_person_count'].to_numpy(dtype=np.float64)
+        samples = np.bincount(hours, minlength=24)
+        sums = np.bincount(hours, weights=counts, minlength=24)
+        seen = samples > 0
+        hourly_avg = pd.DataFrame({
+            'hour': np.arange(24)[seen],
+            'avg_person_count': sums[seen] / samples[seen],
+        })
+
     # Handle missing data
     hourly_avg['avg_person_count'] = hourly_avg['avg_person_count'].fillna(0)
     
     if hourly_avg.shape[0] < 2:
         return None, "Not enough hourly variation."
     
-    # Linear regression model
-    model = LinearRegression()
-    X = hourly_avg[['hour']]
-    y = hourly_avg['avg_person_count']
-    model.fit(X, y)
-    hourly_avg['predicted_occupancy'] = model.predict(X)
+    # Linear trend: closed-form least-squares fit on <=24 points
+    hours = hourly_avg['hour'].to_numpy(dtype=np.float64)
+    counts = hourly_avg['avg_person_count'].to_numpy(dtype=np.float64)
+    slope, intercept = np.polyfit(hours, counts, 1)
+    hourly_avg['predicted_occupancy'] = slope * hours + intercept
     
     return hourly_avg, "Analysis complete."
 
@@ -304,20 +571,21 @@ def real_time_section():
     
     # Fetch or generate data
     if firebase_connected and db:
-        # Fetch real data from Firebase
-        latest_data_query = {"room_id": st.session_state.selected_room, "limit": 1}
-        latest_data_df = fetch_firestore_data(db, latest_data_query)
-        
-        if not latest_data_df.empty:
-            st.session_state.latest_data = latest_data_df.iloc[0].to_dict()
+        # Use the prefetched result when available (fetched in parallel
+        # with the historical window at the top of the run)
+        if st.session_state.get('prefetched_room') == st.session_state.selected_room:
+            latest_data = st.session_state.get('prefetched_latest')
+        else:
+            latest_data = fetch_latest_doc(db, st.session_state.selected_room)
+
+        if latest_data:
+            st.session_state.latest_data = latest_data
         else:
             # Fallback to mock data if no real data
-            mock_current, _ = generate_mock_fallback_data()
-            st.session_state.latest_data = mock_current
+            st.session_state.latest_data = generate_mock_current()
     else:
         # Use mock data when Firebase not available
-        mock_current, _ = generate_mock_fallback_data()
-        st.session_state.latest_data = mock_current
+        st.session_state.latest_data = generate_mock_current()
     
     # Display current metrics
     if st.session_state.latest_data:
@@ -366,6 +634,105 @@ def real_time_section():
         else:
             st.success("🛡️ Safety Status: Normal", icon="✅")
 
+# ==================== DOWNSAMPLING ====================
+LTTB_THRESHOLD = 600
+LTTB_POINTS = 500
+
+def lttb(x, y, n_out=LTTB_POINTS):
+    """Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of the ~n_out points that best preserve the
+    visual shape of the series; a 30-day window plots the same to the
+    eye with a fraction of the figure payload.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1, dtype=np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    anchor = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_bucket = slice(edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[next_bucket].mean()
+        avg_y = y[next_bucket].mean()
+
+        ax, ay = x[anchor], y[anchor]
+        bx, by = x[lo:hi], y[lo:hi]
+        areas = np.abs((ax - avg_x) * (by - ay) - (ax - bx) * (avg_y - ay))
+        anchor = lo + int(areas.argmax())
+        selected[i + 1] = anchor
+
+    return selected
+
+def _lttb_indices(df, column):
+    x = df['timestamp'].astype('int64').to_numpy(dtype='float64')
+    return lttb(x, df[column].to_numpy(dtype='float64'))
+
+# ==================== CHART BUILDERS ====================
+# Constant layout fragments, built once at import. They are plain dicts
+# applied by the cached builders rather than st.cache_resource figure
+# templates: a cached template would be one mutable Figure shared across
+# sessions, and updating its traces per render would race.
+OCCUPANCY_LAYOUT = dict(title='👥 People Count Over Time', height=350)
+ENV_LAYOUT = dict(
+    title='🌡️ Environmental Sensors',
+    height=350,
+    yaxis=dict(title='Light Level (Lux)', side='left'),
+    yaxis2=dict(title='Air Quality (PPM)', side='right', overlaying='y'),
+    legend=dict(x=0, y=1)
+)
+PATTERN_LAYOUT = dict(title='📊 Hourly Occupancy Patterns', height=350)
+
+def _plot_arrays(df, columns):
+    """Extract trace arrays: raw ndarrays skip plotly's Series handling"""
+    return [np.asarray(df[col]) for col in columns]
+
+@st.cache_data(ttl=60, show_spinner=False)
+def build_occupancy_figure(_df, room_id, last_ts, n_points):
+    """Build the people-count chart; cached so unchanged windows skip
+    figure construction and its JSON-sized trace payload entirely.
+    Direct go.Figure construction skips plotly.express's DataFrame
+    introspection (column typing, hover data, grouping)."""
+    x, y = _plot_arrays(_df, ('timestamp', 'avg_person_count'))
+    fig = go.Figure(go.Scatter(
+        x=x,
+        y=y,
+        mode='lines',
+        fill='tozeroy',
+        line=dict(color='#1f77b4')
+    ))
+    fig.update_layout(OCCUPANCY_LAYOUT)
+    return fig
+
+@st.cache_data(ttl=60, show_spinner=False)
+def build_environment_figure(_df, room_id, last_ts, n_points):
+    """Build the dual-axis environmental chart (cached like the count chart)"""
+    x, light, air = _plot_arrays(_df, ('timestamp', 'avg_light_intensity', 'avg_air_quality_ppm'))
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=x,
+        y=light,
+        mode='lines',
+        name='💡 Light (Lux)',
+        line=dict(color='orange')
+    ))
+    fig.add_trace(go.Scatter(
+        x=x,
+        y=air,
+        mode='lines',
+        name='🌬️ Air Quality (PPM)',
+        yaxis='y2',
+        line=dict(color='green')
+    ))
+
+    fig.update_layout(ENV_LAYOUT)
+    return fig
+
 def historical_section():
     """Historical data visualization section"""
     st.markdown("---")
@@ -386,74 +753,56 @@ def historical_section():
     
     # Fetch historical data
     if firebase_connected and db:
-        start_time_dt = datetime.now() - timedelta(hours=st.session_state.hours_to_show)
-        historical_query = {
-            "room_id": st.session_state.selected_room, 
-            "start_time": start_time_dt
-        }
-        historical_df = fetch_firestore_data(db, historical_query)
+        # Reuse the prefetched window unless a range button just changed it
+        historical_df = st.session_state.get('prefetched_history')
+        if (historical_df is None
+                or st.session_state.get('prefetched_room') != st.session_state.selected_room
+                or st.session_state.get('prefetched_hours') != st.session_state.hours_to_show):
+            start_time_dt = datetime.now() - timedelta(hours=st.session_state.hours_to_show)
+            historical_df = fetch_historical_window(db, st.session_state.selected_room, start_time_dt)
         
         if not historical_df.empty:
-            st.session_state.historical_data = historical_df.iloc[::-1].reset_index(drop=True)
+            st.session_state.historical_data = _as_columns(historical_df)
         else:
             # Use mock data as fallback
-            _, mock_historical = generate_mock_fallback_data()
-            st.session_state.historical_data = mock_historical
+            mock_historical = generate_mock_history(st.session_state.selected_room)
+            st.session_state.historical_data = _as_columns(mock_historical)
     else:
         # Use mock data when Firebase not available
-        _, mock_historical = generate_mock_fallback_data()
-        st.session_state.historical_data = mock_historical
-    
+        mock_historical = generate_mock_history(st.session_state.selected_room)
+        st.session_state.historical_data = _as_columns(mock_historical)
+
     # Display charts
-    if not st.session_state.historical_data.empty:
-        df_display = st.session_state.historical_data
+    if st.session_state.historical_data:
+        df_display = _as_df()
         
         # Date range info
         start_time = df_display['timestamp'].min().strftime('%Y-%m-%d %H:%M:%S')
         end_time = df_display['timestamp'].max().strftime('%Y-%m-%d %H:%M:%S')
         st.info(f"📅 Displaying data from **{start_time}** to **{end_time}**")
         
+        # Downsample long ranges before plotting; each chart keeps the
+        # points that matter for its own series
+        if len(df_display) > LTTB_THRESHOLD:
+            df_count = df_display.iloc[_lttb_indices(df_display, 'avg_person_count')]
+            env_idx = np.union1d(_lttb_indices(df_display, 'avg_light_intensity'),
+                                 _lttb_indices(df_display, 'avg_air_quality_ppm'))
+            df_env = df_display.iloc[env_idx]
+        else:
+            df_count = df_env = df_display
+
         # Charts layout
         chart_col1, chart_col2 = st.columns(2)
-        
+        chart_key = (st.session_state.selected_room, df_display['timestamp'].iloc[-1], len(df_display))
+
         with chart_col1:
             # Occupancy chart
-            fig_occupancy = px.area(
-                df_display, 
-                x='timestamp', 
-                y='avg_person_count',
-                title='👥 People Count Over Time',
-                color_discrete_sequence=['#1f77b4']
-            )
-            fig_occupancy.update_layout(height=350)
+            fig_occupancy = build_occupancy_figure(df_count, *chart_key)
             st.plotly_chart(fig_occupancy, use_container_width=True)
-        
+
         with chart_col2:
             # Environmental sensors
-            fig_env = go.Figure()
-            fig_env.add_trace(go.Scatter(
-                x=df_display['timestamp'],
-                y=df_display['avg_light_intensity'],
-                mode='lines',
-                name='💡 Light (Lux)',
-                line=dict(color='orange')
-            ))
-            fig_env.add_trace(go.Scatter(
-                x=df_display['timestamp'],
-                y=df_display['avg_air_quality_ppm'],
-                mode='lines',
-                name='🌬️ Air Quality (PPM)',
-                yaxis='y2',
-                line=dict(color='green')
-            ))
-            
-            fig_env.update_layout(
-                title='🌡️ Environmental Sensors',
-                height=350,
-                yaxis=dict(title='Light Level (Lux)', side='left'),
-                yaxis2=dict(title='Air Quality (PPM)', side='right', overlaying='y'),
-                legend=dict(x=0, y=1)
-            )
+            fig_env = build_environment_figure(df_env, *chart_key)
             st.plotly_chart(fig_env, use_container_width=True)
 
 def ai_analytics_section():
@@ -461,34 +810,48 @@ def ai_analytics_section():
     st.markdown("---")
     st.subheader("🧠 AI-Powered Analytics")
     
-    if not st.session_state.historical_data.empty:
-        df_analysis = st.session_state.historical_data
+    if st.session_state.historical_data:
+        df_analysis = _as_df()
         
         col1, col2 = st.columns(2)
         
         with col1:
-            # Occupancy pattern analysis
-            pattern_df, message = analyze_occupancy_pattern(df_analysis)
+            # Occupancy pattern analysis (server-side rollup when available)
+            if firebase_connected and db:
+                profile_df = fetch_hourly_profile(db, st.session_state.selected_room)
+            else:
+                profile_df = pd.DataFrame()
+            last_ts = df_analysis['timestamp'].iloc[-1] if len(df_analysis) else None
+            pattern_df, message = analyze_occupancy_pattern(
+                df_analysis,
+                st.session_state.selected_room,
+                last_ts,
+                hourly_avg=profile_df
+            )
             
             if pattern_df is not None:
                 peak_hour = pattern_df.loc[pattern_df['avg_person_count'].idxmax()]
                 st.success(f"🎯 **Peak Usage:** {int(peak_hour['hour'])}:00 ({peak_hour['avg_person_count']:.1f} people avg)")
                 
                 # Pattern visualization
-                fig_pattern = px.scatter(
-                    pattern_df, 
-                    x='hour', 
-                    y='avg_person_count',
-                    title='📊 Hourly Occupancy Patterns',
-                    color='avg_person_count',
-                    color_continuous_scale='Blues'
-                )
-                fig_pattern.add_traces(
-                    px.line(pattern_df, x='hour', y='predicted_occupancy').data
-                )
-                fig_pattern.data[1].name = 'Trend Line'
-                fig_pattern.data[1].line.color = 'red'
-                fig_pattern.update_layout(height=350)
+                hours, counts, predicted = _plot_arrays(
+                    pattern_df, ('hour', 'avg_person_count', 'predicted_occupancy'))
+                fig_pattern = go.Figure()
+                fig_pattern.add_trace(go.Scatter(
+                    x=hours,
+                    y=counts,
+                    mode='markers',
+                    marker=dict(color=counts, colorscale='Blues', showscale=True),
+                    showlegend=False
+                ))
+                fig_pattern.add_trace(go.Scatter(
+                    x=hours,
+                    y=predicted,
+                    mode='lines',
+                    name='Trend Line',
+                    line=dict(color='red')
+                ))
+                fig_pattern.update_layout(PATTERN_LAYOUT)
                 st.plotly_chart(fig_pattern, use_container_width=True)
             else:
                 st.warning(f"⚠️ {message}")
@@ -640,17 +1003,21 @@ def sidebar_content():
         st.text(f"Version: 2.0.0")
         st.text(f"Updated: {datetime.now().strftime('%Y-%m-%d')}")
         
-        # Auto-refresh logic
+        # Auto-refresh: a client-side timer triggers the rerun instead of
+        # blocking this session's worker thread for 30 s, so button
+        # presses keep taking effect immediately
         if st.session_state.auto_refresh:
-            time.sleep(30)
-            st.rerun()
+            st_autorefresh(interval=30_000, key='auto_refresh_tick')
 
 # ==================== MAIN APPLICATION ====================
 def main():
     """Main application entry point"""
     # Initialize sidebar
     sidebar_content()
-    
+
+    # Fire the independent Firestore reads in parallel before rendering
+    prefetch_room_data()
+
     # Main dashboard sections
     main_dashboard()
     real_time_section()